@@ -0,0 +1,351 @@
+'''
+benchmark.py
+
+Benchmark every strategy of every problem in this repo against seeded
+random inputs of increasing size.
+
+For each (problem, strategy, size) we record the best wall time over a
+number of repeats, the peak memory the solver added to the process, and the
+solver's own metrics from one further instrumented run (see instrument.py):
+subproblems evaluated, memo hits and misses, table footprint and the time
+spent filling the table versus reconstructing the solution. Each series of
+timings is then fit with a power law, time ~ size^k, to give a scaling
+exponent k, and results can be checked against a previously saved run to
+flag regressions.
+
+    python benchmark.py -o baseline.json
+    python benchmark.py -b baseline.json
+
+The exit status is 1 if any regression was found.
+'''
+import imp
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+
+import coin_change
+import dtw
+import knapsack
+import largest_common_substring
+import max_contiguous_subsequence
+from instrument import Metrics
+
+# held-karp.py is not a valid module name, so load it from its path
+held_karp = imp.load_source(
+    'held_karp', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'held-karp.py'))
+
+
+'''
+Seeded input generators. Each takes the input size and a `random.Random`
+instance and returns the tuple of arguments passed to every strategy of
+that problem.
+'''
+
+def _coin_change_input(size, rng):
+    # always include 1 so every amount can be made
+    denominations = [1] + sorted(rng.sample(range(2, 26), 4))
+    return size, denominations
+
+
+def _knapsack_input(size, rng):
+    weights = [rng.randint(1, 20) for _ in range(size)]
+    values = [rng.randint(1, 100) for _ in range(size)]
+    return weights, values, sum(weights) // 2
+
+
+def _held_karp_input(size, rng):
+    graph = [held_karp.Vertex(rng.uniform(0, 100), rng.uniform(0, 100))
+             for _ in range(size)]
+    return (held_karp.adjacency_matrix(graph),)
+
+
+def _dtw_input(size, rng):
+    nprng = np.random.RandomState(rng.randint(0, 2**31 - 1))
+    return np.cumsum(nprng.randn(size)), np.cumsum(nprng.randn(size))
+
+
+def _substring_input(size, rng):
+    return ([rng.randint(0, 3) for _ in range(size)],
+            [rng.randint(0, 3) for _ in range(size)])
+
+
+def _sequence_input(size, rng):
+    return ([rng.randint(-100, 100) for _ in range(size)],)
+
+
+def _matrix_input(size, rng):
+    nprng = np.random.RandomState(rng.randint(0, 2**31 - 1))
+    return (nprng.randint(-100, 101, size=(size, size)),)
+
+
+'''
+Every problem lists its input generator, the sizes to sweep and its
+strategies. Each strategy is a pair (solver, max_size) where solvers with exponential
+running time are only run up to `max_size`.
+'''
+PROBLEMS = {
+    'coin_change': {
+        'generate': _coin_change_input,
+        'sizes': [25, 50, 100, 200, 400],
+        'strategies': {
+            'recursive': (coin_change.make_change_recursive, 100),
+            'topdown': (coin_change.make_change_topdown, None),
+            'bottomup': (coin_change.make_change_bottomup, None),
+        },
+    },
+    'knapsack': {
+        'generate': _knapsack_input,
+        'sizes': [5, 10, 15, 20, 40, 80],
+        'strategies': {
+            'recursive': (knapsack.knapsack_recursive, 20),
+            # the topdown table is never read back, so it is exponential too
+            'topdown': (knapsack.knapsack_topdown, 20),
+            'bottomup': (knapsack.knapsack_bottomup, None),
+        },
+    },
+    'held_karp': {
+        'generate': _held_karp_input,
+        'sizes': [4, 5, 6, 7, 8, 10, 12],
+        'strategies': {
+            'recursive': (held_karp.held_karp_recursive, 8),
+            'topdown': (held_karp.held_karp_topdown, None),
+            'bottomup': (held_karp.held_karp_bottomup, None),
+        },
+    },
+    'dtw': {
+        'generate': _dtw_input,
+        'sizes': [25, 50, 100, 200],
+        'strategies': {
+            'bottomup': (dtw.dtw, None),
+        },
+    },
+    'largest_common_substring': {
+        'generate': _substring_input,
+        'sizes': [50, 100, 200, 400, 800],
+        'strategies': {
+            'bottomup': (largest_common_substring.largest_common_substring,
+                         None),
+        },
+    },
+    'max_contiguous_subsequence': {
+        'generate': _sequence_input,
+        # the topdown recursion is len(A) deep
+        'sizes': [100, 200, 400, 800],
+        'strategies': {
+            'topdown': (max_contiguous_subsequence
+                        .max_contiguous_subsequence_topdown, None),
+            'bottomup': (max_contiguous_subsequence
+                         .max_contiguous_subsequence_bottomup, None),
+            'kadane': (max_contiguous_subsequence.quick_and_dirty, None),
+        },
+    },
+    'max_sum_submatrix': {
+        'generate': _matrix_input,
+        'sizes': [50, 100, 200, 400],
+        'strategies': {
+            'vectorized': (max_contiguous_subsequence.max_sum_submatrix, None),
+        },
+    },
+}
+
+
+def _status_kb(field):
+    ''' A memory size in kB from /proc/self/status, e.g. VmRSS or VmHWM '''
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+
+
+def _reset_peak_rss():
+    '''
+    Reset VmHWM, the peak resident set size, to the current one. A forked
+    process otherwise inherits the peak of its parent.
+    '''
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+
+def _measure(problem, strategy, size, seed, repeat, conn):
+    '''
+    Run a single benchmark and send (best time, peak kB, metrics dict)
+    through `conn`. This runs in its own process so the peak resident set
+    size can be reset and attributed to this solver alone. The peak is
+    None where /proc does not support that (Linux 4.0 and later does).
+    '''
+    spec = PROBLEMS[problem]
+    solver = spec['strategies'][strategy][0]
+    args = spec['generate'](size, random.Random('{}-{}'.format(seed, size)))
+
+    try:
+        _reset_peak_rss()
+        rss_before = _status_kb('VmRSS')
+    except (IOError, OSError):
+        rss_before = None
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.time()
+        solver(*args)
+        best = min(best, time.time() - t0)
+    peak_kb = None if rss_before is None else \
+        _status_kb('VmHWM') - rss_before
+
+    # instrumented separately so the counters do not skew the timings
+    metrics = Metrics()
+    solver(*args, metrics=metrics)
+
+    conn.send((best, peak_kb, metrics.as_dict()))
+    conn.close()
+
+
+def run(problems=None, strategies=None, seed=0, repeat=3, timeout=60.):
+    '''
+    Benchmark the given problems and strategies (all by default), returning
+    a list of result dicts. A run that fails or exceeds `timeout` seconds is
+    recorded with an error and ends that strategy's sweep.
+    '''
+    results = []
+    for problem in sorted(problems or PROBLEMS):
+        spec = PROBLEMS[problem]
+        for strategy in sorted(spec['strategies']):
+            if strategies and strategy not in strategies:
+                continue
+            max_size = spec['strategies'][strategy][1]
+            for size in spec['sizes']:
+                if max_size is not None and size > max_size:
+                    break
+                result = {'problem': problem, 'strategy': strategy,
+                          'size': size}
+                parent, child = multiprocessing.Pipe(duplex=False)
+                p = multiprocessing.Process(
+                    target=_measure,
+                    args=(problem, strategy, size, seed, repeat, child))
+                p.start()
+                # so that recv() sees EOF if the child dies
+                child.close()
+                try:
+                    if not parent.poll(timeout):
+                        raise EOFError
+                    (result['time'], result['peak_kb'],
+                     metrics) = parent.recv()
+                    result.update(metrics)
+                except EOFError:
+                    result['error'] = 'failed or timed out'
+                    p.terminate()
+                p.join()
+                results.append(result)
+                if 'error' in result:
+                    break
+    return results
+
+
+def scaling_exponents(results):
+    '''
+    Least squares fit of log(time) against log(size) for each
+    (problem, strategy), giving k in time ~ size^k
+    '''
+    series = {}
+    for r in results:
+        if 'time' in r and r['time'] > 0:
+            key = '{}/{}'.format(r['problem'], r['strategy'])
+            series.setdefault(key, []).append((r['size'], r['time']))
+
+    exponents = {}
+    for key, points in series.items():
+        if len(points) >= 2:
+            sizes, times = zip(*points)
+            k, _ = np.polyfit(np.log(sizes), np.log(times), 1)
+            exponents[key] = k
+    return exponents
+
+
+def find_regressions(results, baseline, tolerance=0.25, min_time=1e-3):
+    '''
+    Compare `results` against the results of a `baseline` run, flagging any
+    (problem, strategy, size) that is more than `tolerance` slower. Times
+    below `min_time` seconds in the baseline are too noisy to compare.
+    '''
+    base_times = dict(((r['problem'], r['strategy'], r['size']), r['time'])
+                      for r in baseline['results'] if 'time' in r)
+    regressions = []
+    for r in results:
+        key = (r['problem'], r['strategy'], r['size'])
+        base = base_times.get(key)
+        if base is None or base < min_time:
+            continue
+        if 'error' in r or r['time'] > base * (1 + tolerance):
+            regressions.append({
+                'problem': r['problem'], 'strategy': r['strategy'],
+                'size': r['size'], 'baseline': base,
+                'time': r.get('time'),
+            })
+    return regressions
+
+
+if __name__ == '__main__':
+
+    import argparse
+    p = argparse.ArgumentParser()
+    p.add_argument('-p', '--problems', nargs='+', choices=sorted(PROBLEMS),
+                   help="Problems to benchmark (default: all)")
+    p.add_argument('-s', '--strategies', nargs='+',
+                   help="Strategies to benchmark (default: all)")
+    p.add_argument('--seed', type=int, default=0,
+                   help="Seed for the input generators")
+    p.add_argument('-r', '--repeat', type=int, default=3,
+                   help="Number of timed runs per input, the best is kept")
+    p.add_argument('-t', '--timeout', type=float, default=60.,
+                   help="Seconds before a single benchmark is abandoned")
+    p.add_argument('-o', '--output',
+                   help="File to write the JSON results to")
+    p.add_argument('-b', '--baseline',
+                   help="JSON results of a previous run to check for "
+                        "regressions against")
+    p.add_argument('--tolerance', type=float, default=0.25,
+                   help="Fraction slower than the baseline that counts as "
+                        "a regression")
+    args = p.parse_args()
+
+    results = run(args.problems, args.strategies, args.seed, args.repeat,
+                  args.timeout)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': results,
+        'scaling': scaling_exponents(results),
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = find_regressions(results, json.load(f),
+                                                     args.tolerance)
+
+    for r in results:
+        if 'error' in r:
+            print "{problem:28s} {strategy:10s} {size:6d}  {error}".format(**r)
+        else:
+            print ("{problem:28s} {strategy:10s} {size:6d} {time:10.6f}s "
+                   "{peak_kb!s:>8} kB {subproblems:10d} subproblems "
+                   "{hits:8d} hits {table_bytes:10d} table bytes"
+                   .format(**r))
+    for key, k in sorted(report['scaling'].items()):
+        print "{:39s} time ~ size^{:.2f}".format(key, k)
+    for r in report.get('regressions', []):
+        print "REGRESSION {}/{} size {}: {} vs {:.6f}s".format(
+            r['problem'], r['strategy'], r['size'],
+            'failed' if r['time'] is None else '{:.6f}s'.format(r['time']),
+            r['baseline'])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    sys.exit(1 if report.get('regressions') else 0)
@@ -17,14 +17,18 @@ using denominations of indices 0 to m
     count(c, m) = count(c - values[m], m) + count(c, m-1)
 
 '''
+from instrument import phase
 
-def make_change_recursive(c, values):
+
+def make_change_recursive(c, values, metrics=None):
 
     def _count(c, m):
         '''
         Total number of ways to make change `c` using denominations up to
         index `m` in `values`
         '''
+        if metrics is not None:
+            metrics.subproblems += 1
         if c == 0:
             return 1
         elif c < 0:
@@ -34,7 +38,8 @@ def make_change_recursive(c, values):
         else:
             return _count(c - values[m], m) + _count(c, m-1)
 
-    num_solutions = _count(c, len(values)-1)
+    with phase(metrics, 'fill'):
+        num_solutions = _count(c, len(values)-1)
 
     # enumerate all solutions
     solutions = []
@@ -51,12 +56,15 @@ def make_change_recursive(c, values):
             _generate_solutions(c-values[m], m, l1)
             _generate_solutions(c, m-1, l2)
 
-    _generate_solutions(c, len(values)-1, [])
+    with phase(metrics, 'reconstruct'):
+        _generate_solutions(c, len(values)-1, [])
 
+    if metrics is not None:
+        metrics.emit()
     return num_solutions, solutions
 
 
-def make_change_topdown(c, values):
+def make_change_topdown(c, values, metrics=None):
 
     # create table of dimensions (c+1) X len(values)
     count_table = [[None for col in values] for row in range(c+1)]
@@ -68,12 +76,17 @@ def make_change_topdown(c, values):
             count_table[c][m] = 1
             return count_table[c][m]
         if count_table[c][m] is not None:
+            if metrics is not None:
+                metrics.hit()
             return count_table[c][m]
         else:
+            if metrics is not None:
+                metrics.miss()
             count_table[c][m] = _count(c - values[m], m) + _count(c, m-1)
             return count_table[c][m]
 
-    num_solutions = _count(c, len(values)-1)
+    with phase(metrics, 'fill'):
+        num_solutions = _count(c, len(values)-1)
 
     # enumerate all solutions
     solutions = [[] for i in range(num_solutions)]
@@ -106,32 +119,37 @@ def make_change_topdown(c, values):
                                     max_index)
 
     # populate `solutions`
-    _generate_solutions(c, len(values)-1, 0, len(values)-1)
+    with phase(metrics, 'reconstruct'):
+        _generate_solutions(c, len(values)-1, 0, len(values)-1)
 
+    if metrics is not None:
+        metrics.add_table(count_table)
+        metrics.emit()
     return num_solutions, solutions
 
 
-def make_change_bottomup(c, values):
+def make_change_bottomup(c, values, metrics=None):
     '''
     For the bottom up approach, we start with the base case and build up
     our solution table without recursion.
     '''
     count_table = [[None for col in values] for row in range(c+1)]
-    for amount in range(c+1):
-        for m in range(len(values)):
-            if count_table[amount][m] is not None:
-                pass
-            elif m == 0:
-                # If values[0] divides the amount, we count 1
-                count_table[amount][0] = int(amount % values[0] == 0)
-            elif amount == 0:
-                count_table[amount][m] = 1
-            elif count_table[amount][m] is None:
-                if amount - values[m] < 0:
-                    count_table[amount][m] = count_table[amount][m-1]
-                else:
-                    count_table[amount][m] = count_table[amount - values[m]][m] + \
-                                             count_table[amount][m-1]
+    with phase(metrics, 'fill'):
+        for amount in range(c+1):
+            for m in range(len(values)):
+                if count_table[amount][m] is not None:
+                    pass
+                elif m == 0:
+                    # If values[0] divides the amount, we count 1
+                    count_table[amount][0] = int(amount % values[0] == 0)
+                elif amount == 0:
+                    count_table[amount][m] = 1
+                elif count_table[amount][m] is None:
+                    if amount - values[m] < 0:
+                        count_table[amount][m] = count_table[amount][m-1]
+                    else:
+                        count_table[amount][m] = count_table[amount - values[m]][m] + \
+                                                 count_table[amount][m-1]
     num_solutions = count_table[c][len(values)-1]
 
     '''
@@ -160,8 +178,14 @@ def make_change_bottomup(c, values):
                 _get_solutions(c, m-1, lo+num_using_m, hi)
 
     # Populate `solutions`
-    _get_solutions(c, len(values)-1, 0, len(values)-1)
-
+    with phase(metrics, 'reconstruct'):
+        _get_solutions(c, len(values)-1, 0, len(values)-1)
+
+    if metrics is not None:
+        # every cell of the table is filled exactly once
+        metrics.subproblems += (c+1) * len(values)
+        metrics.add_table(count_table)
+        metrics.emit()
     return num_solutions, solutions
 
 
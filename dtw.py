@@ -1,5 +1,7 @@
 import numpy as np
 
+from instrument import phase
+
 '''
 Dynamic Time Warping
 
@@ -13,7 +15,7 @@ def distance(x, y):
     return np.sqrt(np.sum((x - y)**2))
 
 
-def dtw(a, b):
+def dtw(a, b, metrics=None):
     '''
     Returns the DTW distance between sequences `a` and `b`.
 
@@ -21,6 +23,7 @@ def dtw(a, b):
     -----------
     a : numpy array
     b : numpy array
+    metrics : instrument.Metrics, optional
 
     Returns:
     --------
@@ -38,13 +41,18 @@ def dtw(a, b):
     dtw_table[0, :] = np.inf
     dtw_table[0, 0] = 0.
 
-    for i in xrange(1, a.size+1):
-        for j in xrange(1, b.size+1):
-            cost = distance(a[i-1], b[j-1])
-            dtw_table[i, j] = cost + min(dtw_table[i-1, j],
-                                         dtw_table[i, j-1],
-                                         dtw_table[i-1, j-1])
-
+    with phase(metrics, 'fill'):
+        for i in xrange(1, a.size+1):
+            for j in xrange(1, b.size+1):
+                cost = distance(a[i-1], b[j-1])
+                dtw_table[i, j] = cost + min(dtw_table[i-1, j],
+                                             dtw_table[i, j-1],
+                                             dtw_table[i-1, j-1])
+
+    if metrics is not None:
+        metrics.subproblems += a.size * b.size
+        metrics.add_table(dtw_table)
+        metrics.emit()
     return dtw_table[a.size, b.size], dtw_table
 
 
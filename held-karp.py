@@ -9,8 +9,11 @@ bottom-up dynamic programming approaches.
 '''
 import sys
 
+from instrument import phase
+from tables import MemoryTables, as_python, instance_key
 
-def held_karp_recursive(distance_matrix):
+
+def held_karp_recursive(distance_matrix, metrics=None):
     '''
     Solution to TSP using the Bellman-Held-Karp Algorithm
 
@@ -37,6 +40,8 @@ def held_karp_recursive(distance_matrix):
 
         NOTE: Must be careful not to mutate
         '''
+        if metrics is not None:
+            metrics.subproblems += 1
         # Base case: check if all cities have been visited
         if visited == (1 << n) - 1:
             # we have visited all cities, return to 0
@@ -56,10 +61,15 @@ def held_karp_recursive(distance_matrix):
 
         return min_dist, min_path
 
-    return f(0, 0, [])
+    with phase(metrics, 'fill'):
+        ans = f(0, 0, [])
+
+    if metrics is not None:
+        metrics.emit()
+    return ans
 
 
-def held_karp_topdown(distance_matrix):
+def held_karp_topdown(distance_matrix, metrics=None):
     '''
     Above algorithm, but making use of memoization to avoid recomputing
     overlapping subproblems
@@ -94,7 +104,11 @@ def held_karp_topdown(distance_matrix):
         '''
         # Check the table
         if dp[i][visited]:
+            if metrics is not None:
+                metrics.hit()
             return dp[i][visited]
+        if metrics is not None:
+            metrics.miss()
         # Base case: check if all cities have been visited
         if visited == (1 << n) - 1:
             # we have visited all cities, return to 0
@@ -117,21 +131,27 @@ def held_karp_topdown(distance_matrix):
         return min_dist
 
     # The value we are interested in
-    ans = f(0,1)
+    with phase(metrics, 'fill'):
+        ans = f(0,1)
 
     # Can optain the optimal path using the parent matrix
     path = [0]
     i, visited = 0, 1
-    next_ = child[i][visited]
-    while next_ is not None:
-        path.append(next_)
-        visited |= (1 << next_)
-        next_ = child[next_][visited]
-
+    with phase(metrics, 'reconstruct'):
+        next_ = child[i][visited]
+        while next_ is not None:
+            path.append(next_)
+            visited |= (1 << next_)
+            next_ = child[next_][visited]
+
+    if metrics is not None:
+        metrics.add_table(dp)
+        metrics.add_table(child)
+        metrics.emit()
     return ans, path
 
 
-def held_karp_bottomup(distance_matrix):
+def held_karp_bottomup(distance_matrix, metrics=None, tables=None):
     '''
     In the bottom up implementation, we compute all possible solutions for the
     values `i` and `visited` as in the implementations above, and then
@@ -140,52 +160,76 @@ def held_karp_bottomup(distance_matrix):
     With this approach, we use the dp table, the original `distance_matrix`
     and knowledge of the optimal cost to work backwards in determing what
     the optimal path was.
+
+    The dp table is held by `tables` (see tables.py), in memory by default.
+    A checkpoint can be taken after the column for each `visited` is
+    complete, and a run given the same backend resumes from the last
+    checkpointed column.
     '''
     d = distance_matrix
     n = len(d)
 
-    dp = [[None for i in xrange(2**n)] for j in xrange(n)]
+    if tables is None:
+        tables = MemoryTables()
+    # `progress` is the last value of `visited` that was filled in
+    progress = tables.open(instance_key(d))
 
-    # Base case:
-    # Distance from any city i back to 0 after having visited all cities
-    for i in xrange(n):
-        dp[i][(1<<n)-1] = d[i][0]
+    # Each step below fills a column of dp, so keep columns contiguous
+    dp = tables.table('held_karp', n, 2**n, 'float64', order='F')
+
+    if progress is None:
+        # Base case:
+        # Distance from any city i back to 0 after having visited all cities
+        for i in xrange(n):
+            dp[i][(1<<n)-1] = d[i][0]
+        progress = (1<<n)-1
 
     # Fill in all values of the dp table, excluding the values from the
     # base case we've already inserted
     # Note we started with having visited all cities except for 0
     # and work backwards from there
-    for visited in reversed(xrange((1<<n)-1)):
-        for i in xrange(n):
-            min_dist = sys.maxint
-            for j in xrange(n):
-                if not (1 << j) & visited:
-                    dist_j = d[i][j] + dp[j][visited | (1 << j)]
+    with phase(metrics, 'fill'):
+        for visited in reversed(xrange(progress)):
+            # f(j, visited | (1 << j)) for each unvisited city j is the same
+            # for every i, so read each from the table once
+            unvisited = [(j, as_python(dp[j][visited | (1 << j)]))
+                         for j in xrange(n) if not (1 << j) & visited]
+            for i in xrange(n):
+                min_dist = sys.maxint
+                for j, dist_from_j in unvisited:
+                    dist_j = d[i][j] + dist_from_j
                     if dist_j < min_dist:
                         min_dist = dist_j
-            dp[i][visited] = min_dist
+                dp[i][visited] = min_dist
+            tables.checkpoint(visited)
+    tables.checkpoint(0, force=True)
 
-    ans = dp[0][1]
+    ans = as_python(dp[0][1])
 
     # We can also optain the optimal path working backwards using
     # the table and the knowledge of the cost of the optimal path
     path = [0]
     i, visited = 0, 1
     cost_from_i = dp[i][visited]
-    while visited != (1 << n)-1:
-        for j in xrange(n):
-            if not visited & (1 << j):
-                cost_from_j = dp[j][visited | (1 << j)]
-                # require a tolerance for real valued distances
-                if abs((cost_from_i - cost_from_j) - d[i][j]) < 0.001:
-                    # j was the city selected in the opt solution
-                    path.append(j)
-                    i, visited = j, visited | (1 << j)
-                    cost_from_i = cost_from_j
-                    break
+    with phase(metrics, 'reconstruct'):
+        while visited != (1 << n)-1:
+            for j in xrange(n):
+                if not visited & (1 << j):
+                    cost_from_j = dp[j][visited | (1 << j)]
+                    # require a tolerance for real valued distances
+                    if abs((cost_from_i - cost_from_j) - d[i][j]) < 0.001:
+                        # j was the city selected in the opt solution
+                        path.append(j)
+                        i, visited = j, visited | (1 << j)
+                        cost_from_i = cost_from_j
+                        break
     # We have visited all cities, so return to 0
     path.append(0)
 
+    if metrics is not None:
+        metrics.subproblems += n * progress
+        metrics.add_table(dp)
+        metrics.emit()
     return ans, path
 
 
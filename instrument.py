@@ -0,0 +1,116 @@
+'''
+instrument.py
+
+Opt-in instrumentation shared by the solvers in this repo.
+
+Every solver takes an optional `metrics` argument. When it is None (the
+default) the solver runs exactly as before. When it is a `Metrics`
+instance, the solver records:
+
+    subproblems   number of subproblem values computed
+    hits          memo lookups that found a stored value (topdown only)
+    misses        memo lookups that had to compute the value (topdown only)
+    table_cells   cells allocated across all DP tables
+    table_bytes   approximate bytes held by those tables
+    phases        seconds spent in each phase, e.g. 'fill' and 'reconstruct'
+
+and passes them, as a dict, to the optional `callback` once it is done.
+
+    m = Metrics(callback=print_metrics)
+    held_karp_topdown(distance_matrix, metrics=m)
+
+Solvers count inside their own recursion and memo checks, behind an
+`if metrics is not None` test, so instrumenting a solver does not change
+how deep it recurses.
+'''
+import sys
+import time
+
+
+class Metrics(object):
+    ''' Counters and timers collected from a single solver call '''
+    def __init__(self, callback=None):
+        self.subproblems = 0
+        self.hits = 0
+        self.misses = 0
+        self.table_cells = 0
+        self.table_bytes = 0
+        self.phases = {}
+        self.callback = callback
+
+    def hit(self):
+        ''' A memo lookup found its value '''
+        self.hits += 1
+
+    def miss(self):
+        ''' A memo lookup did not, so the subproblem is evaluated '''
+        self.misses += 1
+        self.subproblems += 1
+
+    def add_table(self, table):
+        '''
+        Record the footprint of a DP table, either a numpy array or a list
+        of lists. The size of a list of lists is an estimate that includes
+        the row lists and the values stored in them.
+        '''
+        if hasattr(table, 'nbytes'):
+            self.table_cells += table.size
+            self.table_bytes += table.nbytes
+            return
+        self.table_bytes += sys.getsizeof(table)
+        for row in table:
+            self.table_cells += len(row)
+            self.table_bytes += sys.getsizeof(row) + \
+                sum(sys.getsizeof(v) for v in row if v is not None)
+
+    def phase(self, name):
+        ''' Context manager adding the time spent in its block to `name` '''
+        return _Phase(self, name)
+
+    def as_dict(self):
+        return {
+            'subproblems': self.subproblems,
+            'hits': self.hits,
+            'misses': self.misses,
+            'table_cells': self.table_cells,
+            'table_bytes': self.table_bytes,
+            'phases': dict(self.phases),
+        }
+
+    def emit(self):
+        ''' Hand the collected metrics to the callback, if there is one '''
+        if self.callback is not None:
+            self.callback(self.as_dict())
+
+
+class _Phase(object):
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.time()
+
+    def __exit__(self, *exc_info):
+        phases = self.metrics.phases
+        phases[self.name] = phases.get(self.name, 0.) + time.time() - self.t0
+
+
+class _NoPhase(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(metrics, name):
+    '''
+    Time a phase of a solver as `name` if `metrics` is given, otherwise
+    do nothing
+    '''
+    if metrics is None:
+        return _NO_PHASE
+    return metrics.phase(name)
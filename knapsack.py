@@ -11,9 +11,13 @@ Then it can be constructed by taking the max of two possibilities:
     opt(n,w) = max(opt(n-1, w), opt(n-1, w-w_n) + v_n)
 
 '''
+import numbers
 
+from instrument import phase
+from tables import MemoryTables, as_python, instance_key
 
-def knapsack_recursive(weights, values, W):
+
+def knapsack_recursive(weights, values, W, metrics=None):
     '''
     Recursive approach
     weights is array of length n containing the weights
@@ -22,6 +26,8 @@ def knapsack_recursive(weights, values, W):
     '''
     def opt(n, w):
         ''' optimal solution using items up to n and max weight capacity w '''
+        if metrics is not None:
+            metrics.subproblems += 1
         if n == 0 or w == 0:
             return 0
         if w - weights[n-1] < 0:
@@ -31,10 +37,15 @@ def knapsack_recursive(weights, values, W):
             # either (1) do not take item n, or (2) take it
             return max(opt(n-1, w), opt(n-1, w-weights[n-1]) + values[n-1])
 
-    return opt(len(values), W)
+    with phase(metrics, 'fill'):
+        opt_val = opt(len(values), W)
+
+    if metrics is not None:
+        metrics.emit()
+    return opt_val
 
 
-def knapsack_topdown(weights, values, W):
+def knapsack_topdown(weights, values, W, metrics=None):
     '''
     Topdown approach. Same as the recursive, except we save values that we
     have already calculated.
@@ -46,6 +57,9 @@ def knapsack_topdown(weights, values, W):
 
     def opt(n, w):
         # note item n is index n-1 in weights[] and values[]
+        if metrics is not None:
+            # `table` is only written to, so every call is evaluated afresh
+            metrics.subproblems += 1
         if n == 0 or w == 0:
             table[n][w] = 0
             return table[n][w]
@@ -57,51 +71,83 @@ def knapsack_topdown(weights, values, W):
                               opt(n-1, w-weights[n-1]) + values[n-1])
             return table[n][w]
 
-    return opt(len(values), W)
+    with phase(metrics, 'fill'):
+        opt_val = opt(len(values), W)
+
+    if metrics is not None:
+        metrics.add_table(table)
+        metrics.emit()
+    return opt_val
 
 
-def knapsack_bottomup(weights, values, W):
+def knapsack_bottomup(weights, values, W, metrics=None, tables=None):
     '''
     Bottom up approach. Here we start with the base case and store solutions
     for all possible subproblems up to the desired solution, building off
     of previously calculated solutions as necessary.
+
+    The table is held by `tables` (see tables.py), in memory by default.
+    A checkpoint can be taken after each item's row is complete, and a run
+    given the same backend resumes after the last checkpointed row.
     '''
+    if tables is None:
+        tables = MemoryTables()
+    progress = tables.open(instance_key(weights, values, W))
+
     # table to store the values
     # table[n][w] is the max value using items up to index n and weight
     # capacity w
     # (n+1) for n = 0 (no items) and w = 0 (max weight capacity 0)
-    table = [[None for col in range(W+1)] for row in range(len(values)+1)]
-
-    # fill in table with base case
-    for row in range(len(values)+1):
-        table[row][0] = 0
-    for col in range(W+1):
-        table[0][col] = 0
-
-    for n in range(1, len(values)+1):
-        for w in range(1, W+1):
-            # weights[n-1] is weight of item n here
-            if w-weights[n-1] < 0:
-                table[n][w] = table[n-1][w]
-            else:
-                table[n][w] = max(table[n-1][w],
-                                  table[n-1][w-weights[n-1]] + values[n-1])
-
-    opt_val = table[len(values)][W]
+    dtype = 'int64' if all(isinstance(v, numbers.Integral) for v in values) \
+        else 'float64'
+    table = tables.table('knapsack', len(values)+1, W+1, dtype)
+
+    if progress is None:
+        # fill in table with base case
+        for row in range(len(values)+1):
+            table[row][0] = 0
+        for col in range(W+1):
+            table[0][col] = 0
+        progress = 0
+
+    # Each row is built as a plain list from the previous one and then
+    # stored in the table whole, whatever backend holds the table
+    prev = as_python(table[progress])
+    with phase(metrics, 'fill'):
+        for n in range(progress+1, len(values)+1):
+            row = [0] * (W+1)
+            for w in range(1, W+1):
+                # weights[n-1] is weight of item n here
+                if w-weights[n-1] < 0:
+                    row[w] = prev[w]
+                else:
+                    row[w] = max(prev[w], prev[w-weights[n-1]] + values[n-1])
+            table[n] = row
+            prev = row
+            # row n is complete
+            tables.checkpoint(n)
+    tables.checkpoint(len(values), force=True)
+
+    opt_val = as_python(table[len(values)][W])
 
     # For the bottom up approach we will work backwards using the optimal
     # value and the dp table to obtain the items chosen
     n_, w_ = len(values), W
     items = []
-    while table[n_][w_]:
-        if w_ - weights[n_-1] < 0:
-            n_, w_ = n_-1, w_
-        elif table[n_-1][w-weights[n_-1]] + values[n_-1] > table[n_-1][w_]:
-            items.append(n_-1)
-            n_, w_ = n_-1, w_-weights[n_-1]
-        else:
-            n_, w_ = n_-1, w_
+    with phase(metrics, 'reconstruct'):
+        while table[n_][w_]:
+            if w_ - weights[n_-1] < 0:
+                n_, w_ = n_-1, w_
+            elif table[n_-1][w_-weights[n_-1]] + values[n_-1] > table[n_-1][w_]:
+                items.append(n_-1)
+                n_, w_ = n_-1, w_-weights[n_-1]
+            else:
+                n_, w_ = n_-1, w_
 
+    if metrics is not None:
+        metrics.subproblems += (len(values) - progress) * W
+        metrics.add_table(table)
+        metrics.emit()
     return opt_val, items
 
 
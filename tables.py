@@ -0,0 +1,156 @@
+'''
+tables.py
+
+Storage backends for the DP tables of the bottom-up solvers.
+
+A backend hands out 2-D tables indexed as table[row][col] and is told by the
+solver how far the fill has progressed, so that an interrupted run can pick
+up where it left off:
+
+    progress = tables.open(key)     # None unless resuming the same instance
+    table = tables.table('name', rows, cols, dtype)
+    ...
+    tables.checkpoint(progress)     # after each complete unit of work
+
+`MemoryTables` keeps the usual lists of lists and never checkpoints.
+`MmapTables` keeps each table in a memory-mapped file in a directory, so
+tables can be larger than RAM, and periodically records the progress of the
+fill there, so a run killed part way through can be resumed:
+
+    tables = MmapTables('/scratch/tsp')
+    held_karp_bottomup(distance_matrix, tables=tables)
+'''
+import hashlib
+import json
+import os
+import time
+
+
+def instance_key(*args):
+    '''
+    Identify a problem instance, so a checkpoint is only resumed by it.
+    Numpy arrays are hashed by their data, since their repr elides the
+    middle of large arrays.
+    '''
+    h = hashlib.sha1()
+    _hash_into(h, args)
+    return h.hexdigest()
+
+
+def _hash_into(h, obj):
+    if hasattr(obj, 'tobytes'):
+        h.update('array {} {}:'.format(obj.dtype.str, obj.shape))
+        h.update(obj.tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update('[{}:'.format(len(obj)))
+        for item in obj:
+            _hash_into(h, item)
+        h.update(']')
+    else:
+        h.update('{!r},'.format(obj))
+
+
+def as_python(value):
+    '''
+    Plain Python number, or list of them, for a value or row read from a
+    table of any backend
+    '''
+    return value.tolist() if hasattr(value, 'tolist') else value
+
+
+class MemoryTables(object):
+    ''' In-memory lists of lists, with nothing to resume from '''
+    def open(self, key):
+        return None
+
+    def table(self, name, rows, cols, dtype=float, order='C'):
+        return [[None for col in xrange(cols)] for row in xrange(rows)]
+
+    def checkpoint(self, progress, force=False):
+        pass
+
+
+class MmapTables(object):
+    '''
+    Tables stored as numpy memory-mapped files in `directory`.
+
+    A checkpoint flushes every table to disk and then records `progress`,
+    along with the name, shape and dtype of each table, so the recorded
+    progress never runs ahead of the data. Checkpoints are taken at most
+    once every `interval` seconds unless forced.
+    '''
+    def __init__(self, directory, interval=60.):
+        self.directory = directory
+        self.interval = interval
+        self._key = None
+        self._state = None
+        self._maps = {}
+        self._layouts = {}
+        self._last_checkpoint = time.time()
+
+    def _path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def open(self, key):
+        '''
+        Start or resume the run for instance `key`, returning the progress
+        of the last checkpoint, or None if there is nothing to resume
+        '''
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self._key = key
+        self._maps = {}
+        self._layouts = {}
+        try:
+            with open(self._path('checkpoint.json')) as f:
+                state = json.load(f)
+        except (IOError, ValueError):
+            state = None
+        if state is None or state['key'] != key:
+            # the tables are about to be overwritten, so a checkpoint of
+            # another instance must not survive to be resumed from them
+            if state is not None:
+                os.remove(self._path('checkpoint.json'))
+            state = None
+        self._state = state
+        self._last_checkpoint = time.time()
+        return state['progress'] if state is not None else None
+
+    def table(self, name, rows, cols, dtype=float, order='C'):
+        '''
+        Memory-mapped table of shape (rows, cols). Use order='F' when the
+        solver fills the table a column at a time, so that each column is
+        contiguous on disk.
+        '''
+        import numpy as np
+
+        layout = [rows, cols, np.dtype(dtype).str, order]
+        if self._state is not None:
+            if self._state.get('tables', {}).get(name) != layout:
+                raise ValueError(
+                    "checkpoint in {} does not match table {!r} {}".format(
+                        self.directory, name, layout))
+            mode = 'r+'
+        else:
+            mode = 'w+'
+        m = np.memmap(self._path(name + '.dat'), dtype=dtype, mode=mode,
+                      shape=(rows, cols), order=order)
+        self._maps[name] = m
+        self._layouts[name] = layout
+        # a plain ndarray view of the map avoids the memmap overhead on
+        # every element access, and writes through to the same file
+        return m.view(np.ndarray)
+
+    def checkpoint(self, progress, force=False):
+        now = time.time()
+        if not force and now - self._last_checkpoint < self.interval:
+            return
+        for m in self._maps.values():
+            m.flush()
+        # write then rename, so an interruption leaves the last checkpoint
+        tmp = self._path('checkpoint.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'key': self._key, 'progress': progress,
+                       'tables': self._layouts}, f)
+        os.rename(tmp, self._path('checkpoint.json'))
+        self._last_checkpoint = now